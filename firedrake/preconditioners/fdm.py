@@ -264,8 +264,18 @@ class FDMPC(PCBase):
         ndim = V.ufl_domain().topological_dimension()
         shift = get_axes_shift(V.finat_element) % ndim
 
-        index_cell, nel = glonum_fun(V.cell_node_map())
-        index_coef, _ = glonum_fun(Gq.cell_node_map())
+        nel = get_cell_count(V.cell_node_map())
+        coef_nodes = glonum(Gq.cell_node_map())
+
+        # global row indices of the DOFs on each cell, negative on the Dirichlet DOFs
+        cell_nodes = glonum(V.cell_node_map())[:nel]
+        cell_dofs = numpy.add.outer(cell_nodes*bsize, numpy.arange(bsize, dtype=cell_nodes.dtype))
+        cell_dofs = numpy.reshape(lgmap.apply(cell_dofs), cell_dofs.shape)
+        # split the row indices of each cell by vector component
+        if bsize == ncomp:
+            comp_rows = numpy.transpose(cell_dofs, (0, 2, 1))
+        else:
+            comp_rows = numpy.reshape(cell_dofs, (nel, ncomp, sdim))
         flag2id = numpy.kron(numpy.eye(ndim, ndim, dtype=PETSc.IntType), [[1], [2]])
 
         # pshape is the shape of the DOFs in the tensor product
@@ -274,14 +284,25 @@ class FDMPC(PCBase):
             assert ncomp == ndim
             pshape = [tuple(numpy.roll(pshape, -shift*k)) for k in range(ncomp)]
 
+        # permutation of axes with respect to the first vector component
+        axes_comp = [numpy.roll(numpy.arange(ndim), -shift*k) for k in range(ncomp)]
+        # interval mass matrices for each component and direction
+        Bfdm = [[Afdm[ax][0] for ax in axes] for axes in axes_comp]
+
         if A.getType() != PETSc.Mat.Type.PREALLOCATOR:
             A.zeroEntries()
             for assemble_coef in self.assembly_callables:
                 assemble_coef()
 
         # insert the identity in the Dirichlet rows and columns
-        for row in V.dof_dset.lgmap.indices[lgmap.indices < 0]:
-            A.setValue(row, row, 1.0E0, imode)
+        rows = V.dof_dset.lgmap.indices[lgmap.indices < 0]
+        indptr = numpy.arange(rows.size+1, dtype=PETSc.IntType)
+        A.setValuesIJV(indptr, rows, numpy.ones(rows.shape, dtype=PETSc.ScalarType), imode, rowmap=rows)
+
+        # sum the coefficients over the nodes of each cell
+        Gq_cell = numpy.sum(Gq.dat.data_ro[coef_nodes[:nel]], axis=1)
+        if Bq is not None:
+            Bq_cell = numpy.sum(Bq.dat.data_ro[coef_nodes[:nel]], axis=1)
 
         # assemble zero-th order term separately, including off-diagonals (mixed components)
         # I cannot do this for hdiv elements as off-diagonals are not sparse, this is because
@@ -294,64 +315,64 @@ class FDMPC(PCBase):
             for k in range(1, ndim):
                 Be = Be.kron(Afdm[k][0])
 
+            # the sparsity of Ae = Be kron Bq[e] is the same on every cell,
+            # so we compute it once from Be kron ones(bshape)
             aptr = numpy.arange(0, (bshape[0]+1)*bshape[1], bshape[1], dtype=PETSc.IntType)
             aidx = numpy.tile(numpy.arange(bshape[1], dtype=PETSc.IntType), bshape[0])
+            adata = numpy.ones((aidx.size,), dtype=PETSc.RealType)
+            Ae = PETSc.Mat().createAIJWithArrays(bshape, (aptr, aidx, adata), comm=PETSc.COMM_SELF)
+            Ae = Be.kron(Ae)
+            indptr, indices, bdata = Ae.getValuesCSR()
+            Ae.destroy()
+            Be.destroy()
+
+            # index of the Bq[e] entry that multiplies each entry of Ae
+            iq = numpy.repeat(numpy.arange(indptr.size-1, dtype=PETSc.IntType), numpy.diff(indptr))
+            iq = (iq % bshape[0]) * bshape[1] + indices % bshape[1]
             for e in range(nel):
                 # Ae = Be kron Bq[e]
-                adata = numpy.sum(Bq.dat.data_ro[index_coef(e)], axis=0)
-                Ae = PETSc.Mat().createAIJWithArrays(bshape, (aptr, aidx, adata), comm=PETSc.COMM_SELF)
-                Ae = Be.kron(Ae)
-
-                ie = index_cell(e)
-                ie = numpy.repeat(ie*bsize, bsize) + numpy.tile(numpy.arange(bsize, dtype=ie.dtype), len(ie))
-                rows = lgmap.apply(ie)
-                set_submat_csr(A, Ae, rows, imode)
-                Ae.destroy()
-            Be.destroy()
+                adata = numpy.reshape(Bq_cell[e], (-1,))
+                rows = numpy.reshape(cell_dofs[e], (-1,))
+                A.setValuesIJV(indptr, rows[indices], bdata * adata[iq], imode, rowmap=rows)
             Bq = None
 
+        # BC flags on each direction for every cell and component
+        bcflags_cell = bcflags[:nel]
+        if len(bcflags_cell.shape) == 2:
+            bcflags_cell = numpy.repeat(bcflags_cell[:, :, None], ncomp, axis=2)
+        fbc_cell = numpy.einsum("efk,fd->ekd", bcflags_cell, flag2id)
+
         # assemble the second order term and the zero-th order term if any,
         # discarding mixed derivatives and mixed components
+        # the Kronecker products only depend on the component and the BCs on the cell
+        kron_cache = {}
         for e in range(nel):
-            ie = numpy.reshape(index_cell(e), (ncomp//bsize, -1))
-            je = index_coef(e)
-            bce = bcflags[e]
-
             # get second order coefficient on this cell
-            mue = numpy.atleast_1d(numpy.sum(Gq.dat.data_ro[je], axis=0))
+            mue = numpy.atleast_1d(Gq_cell[e])
             if Bq is not None:
                 # get zero-th order coefficient on this cell
-                bqe = numpy.atleast_1d(numpy.sum(Bq.dat.data_ro[je], axis=0))
+                bqe = numpy.atleast_1d(Bq_cell[e])
 
             for k in range(ncomp):
-                # permutation of axes with respect to the first vector component
-                axes = numpy.roll(numpy.arange(ndim), -shift*k)
+                axes = axes_comp[k]
                 # for each component: compute the stiffness matrix Ae
                 muk = mue[k] if len(mue.shape) == 2 else mue
-                bck = bce[:, k] if len(bce.shape) == 2 else bce
-                fbc = numpy.dot(bck, flag2id)
+                fbc = fbc_cell[e, k]
+
+                key = (k, *fbc)
+                terms = kron_cache.get(key)
+                if terms is None:
+                    Ak = [Afdm[ax][1+fbc[i]] for i, ax in enumerate(axes)]
+                    terms = kron_cache[key] = kron_terms(Ak, Bfdm[k])
+                indptr, indices, tdata = terms
 
-                # Ae = mue[k][0] Ahat + bqe[k] Bhat
-                Be = Afdm[axes[0]][0].copy()
-                Ae = Afdm[axes[0]][1+fbc[0]].copy()
-                Ae.scale(muk[0])
+                # Ae = mue[k][0] Ahat kron Bhat kron Bhat + ... + bqe[k] Bhat kron Bhat kron Bhat
+                adata = numpy.dot(muk[:ndim], tdata[:ndim])
                 if Bq is not None:
-                    Ae.axpy(bqe[k], Be)
-
-                if ndim > 1:
-                    # Ae = Ae kron Bhat + mue[k][1] Bhat kron Ahat
-                    Ae = Ae.kron(Afdm[axes[1]][0])
-                    Ae.axpy(muk[1], Be.kron(Afdm[axes[1]][1+fbc[1]]))
-                    if ndim > 2:
-                        # Ae = Ae kron Bhat + mue[k][2] Bhat kron Bhat kron Ahat
-                        Be = Be.kron(Afdm[axes[1]][0])
-                        Ae = Ae.kron(Afdm[axes[2]][0])
-                        Ae.axpy(muk[2], Be.kron(Afdm[axes[2]][1+fbc[2]]))
-
-                rows = lgmap.apply(ie[0]*bsize+k if bsize == ncomp else ie[k])
-                set_submat_csr(A, Ae, rows, imode)
-                Ae.destroy()
-                Be.destroy()
+                    adata += bqe[k] * tdata[-1]
+
+                rows = comp_rows[e][k]
+                A.setValuesIJV(indptr, rows[indices], adata, imode, rowmap=rows)
 
         # assemble SIPG interior facet terms if the normal derivatives have been set up
         if any(Dk is not None for Dk in Dfdm):
@@ -360,25 +381,48 @@ class FDMPC(PCBase):
             index_facet, local_facet_data, nfacets = get_interior_facet_maps(V)
             index_coef, _, _ = get_interior_facet_maps(Gq_facet or Gq)
             rows = numpy.zeros((2, sdim), dtype=PETSc.IntType)
+
+            # global row indices of the DOFs on the two cells sharing each facet, split by vector component
+            facet_dofs = numpy.add.outer(index_facet*bsize, numpy.arange(bsize, dtype=index_facet.dtype))
+            facet_dofs = numpy.reshape(lgmap.apply(facet_dofs), facet_dofs.shape)
+            if bsize == ncomp:
+                facet_rows = numpy.transpose(numpy.reshape(facet_dofs, (nfacets, 2, sdim, bsize)), (0, 3, 1, 2))
+            else:
+                facet_rows = numpy.reshape(facet_dofs, (nfacets, 2, ncomp, sdim))
+
+            # gather the coefficients on the two cells sharing each facet
+            coef_facet = numpy.reshape(index_coef, (nfacets, 2, index_coef.shape[1]//2))
+            if PT_facet:
+                lfd_all = numpy.expand_dims(local_facet_data.astype(coef_facet.dtype), axis=2)
+                coef_facet = numpy.take_along_axis(coef_facet, lfd_all, axis=2)[:, :, 0]
+                Pfacet_all = PT_facet.dat.data_ro_with_halos[coef_facet]
+                Gfacet_all = Gq_facet.dat.data_ro_with_halos[coef_facet]
+            else:
+                Gfacet_all = numpy.sum(Gq.dat.data_ro_with_halos[coef_facet], axis=2)
+
+            # the tangential factors are the same on every facet: Bfacet = Bhat kron ... kron Bhat
+            Bfacet = [None]*ncomp
+            if ndim == 2:
+                Bfacet = [Bk[1].copy() for Bk in Bfdm]
+            elif ndim == 3:
+                Bfacet = [Bk[1].kron(Bk[2]) for Bk in Bfdm]
+
+            # work arrays for the dense facet matrices on each direction
+            Adense_dir = [None if Dk is None else numpy.zeros((2*Dk.shape[0],)*2, dtype=PETSc.RealType) for Dk in Dfdm]
+
             for e in range(nfacets):
                 # for each interior facet: compute the SIPG stiffness matrix Ae
-                ie = index_facet(e)
-                je = numpy.reshape(index_coef(e), (2, -1))
-                lfd = local_facet_data(e)
+                lfd = local_facet_data[e]
                 idir = lfd // 2
 
+                Gfacet = Gfacet_all[e]
                 if PT_facet:
-                    icell = numpy.reshape(lgmap.apply(ie), (2, ncomp, -1))
                     iord0 = numpy.insert(numpy.delete(numpy.arange(ndim), idir[0]), 0, idir[0])
                     iord1 = numpy.insert(numpy.delete(numpy.arange(ndim), idir[1]), 0, idir[1])
-                    je = je[[0, 1], lfd]
-                    Pfacet = PT_facet.dat.data_ro_with_halos[je]
-                    Gfacet = Gq_facet.dat.data_ro_with_halos[je]
-                else:
-                    Gfacet = numpy.sum(Gq.dat.data_ro_with_halos[je], axis=1)
+                    Pfacet = Pfacet_all[e]
 
                 for k in range(ncomp):
-                    axes = numpy.roll(numpy.arange(ndim), -shift*k)
+                    axes = axes_comp[k]
                     Dfacet = Dfdm[axes[0]]
                     if Dfacet is None:
                         continue
@@ -397,7 +441,8 @@ class FDMPC(PCBase):
                             mu = Gfacet
 
                     offset = Dfacet.shape[0]
-                    Adense = numpy.zeros((2*offset, 2*offset), dtype=PETSc.RealType)
+                    Adense = Adense_dir[axes[0]]
+                    Adense.fill(0.0E0)
                     dense_indices = []
                     for j, jface in enumerate(lfd):
                         j0 = j * offset
@@ -423,12 +468,13 @@ class FDMPC(PCBase):
                     Ae = numpy_to_petsc(Adense, dense_indices, diag=False)
                     if ndim > 1:
                         # assume that the mesh is oriented
-                        Ae = Ae.kron(Afdm[axes[1]][0])
-                        if ndim > 2:
-                            Ae = Ae.kron(Afdm[axes[2]][0])
+                        Ae_facet = Ae
+                        Ae = Ae_facet.kron(Bfacet[k])
+                        Ae_facet.destroy()
 
+                    icell = facet_rows[e]
                     if bsize == ncomp:
-                        icell = numpy.reshape(lgmap.apply(k+bsize*ie), (2, -1))
+                        icell = icell[k]
                         rows[0] = pull_axis(icell[0], pshape, idir[0])
                         rows[1] = pull_axis(icell[1], pshape, idir[1])
                     else:
@@ -438,6 +484,10 @@ class FDMPC(PCBase):
 
                     set_submat_csr(A, Ae, rows, imode)
                     Ae.destroy()
+
+            for Bk in Bfacet:
+                if Bk is not None:
+                    Bk.destroy()
         A.assemble()
 
     def assemble_coef(self, J, quad_deg, discard_mixed=True, cell_average=True):
@@ -578,18 +628,60 @@ def get_piola_tensor(mapping, domain):
         raise NotImplementedError("Unsupported element mapping %s" % mapping)
 
 
+def kron_terms(Ahat, Bhat):
+    """
+    Return the Kronecker products of interval matrices that make up the stiffness and mass matrices on a cell.
+
+    :arg Ahat: a list with the interval stiffness :class:`PETSc.Mat` on each direction
+    :arg Bhat: a list with the interval mass :class:`PETSc.Mat` on each direction
+
+    :returns: a 3-tuple with the CSR arrays indptr, indices, and data of the products
+        Bhat kron ... kron Ahat kron ... kron Bhat, with Ahat on each direction, followed by Bhat kron ... kron Bhat.
+        All the products are given on the union of their sparsity patterns, data[i] holds the values of the i-th product.
+    """
+    terms = []
+    for i in range(len(Bhat)+1):
+        factors = [Ahat[j] if i == j else Bhat[j] for j in range(len(Bhat))]
+        T = factors[0].copy()
+        for F in factors[1:]:
+            Tprev = T
+            T = Tprev.kron(F)
+            Tprev.destroy()
+        terms.append(T)
+
+    # get the union of the sparsity patterns
+    Aunion = terms[0].copy()
+    for T in terms[1:]:
+        Aunion.axpy(1.0E0, T)
+    indptr, indices, _ = Aunion.getValuesCSR()
+
+    # get the values of each product on the union of the sparsity patterns
+    data = numpy.zeros((len(terms), indices.size), dtype=PETSc.ScalarType)
+    for i, T in enumerate(terms):
+        Aunion.zeroEntries()
+        Aunion.axpy(1.0E0, T, structure=PETSc.Mat.Structure.SUBSET_NONZERO_PATTERN)
+        data[i] = Aunion.getValuesCSR()[2]
+        T.destroy()
+    Aunion.destroy()
+    return indptr, indices, data
+
+
+@lru_cache(maxsize=10)
+def axis_permutation(pshape, idir):
+    """return the indices that reorder an array of shape pshape with axis idir moved to the front"""
+    return numpy.reshape(numpy.moveaxis(numpy.reshape(numpy.arange(numpy.prod(pshape)), pshape), idir, 0), (-1,))
+
+
 def pull_axis(x, pshape, idir):
     """permute x by reshaping into pshape and moving axis idir to the front"""
-    return numpy.reshape(numpy.moveaxis(numpy.reshape(x.copy(), pshape), idir, 0), x.shape)
+    return x[axis_permutation(tuple(pshape), int(idir))]
 
 
 def set_submat_csr(A_global, A_local, global_indices, imode):
     """insert values from A_local to A_global on the diagonal block with indices global_indices"""
     indptr, indices, data = A_local.getValuesCSR()
-    for i, row in enumerate(global_indices.flat):
-        i0 = indptr[i]
-        i1 = indptr[i+1]
-        A_global.setValues(row, global_indices.flat[indices[i0:i1]], data[i0:i1], imode)
+    rows = numpy.reshape(global_indices, (-1,))
+    A_global.setValuesIJV(indptr, rows[indices], data, imode, rowmap=rows)
 
 
 def numpy_to_petsc(A_numpy, dense_indices, diag=True):
@@ -597,31 +689,20 @@ def numpy_to_petsc(A_numpy, dense_indices, diag=True):
     Create a SeqAIJ Mat from a dense matrix using the diagonal and a subset of rows and columns.
     If dense_indices is empty, then also include the off-diagonal corners of the matrix.
     """
-    n = A_numpy.shape[0]
-    nbase = int(diag) + len(dense_indices)
-    nnz = numpy.full((n,), nbase, dtype=PETSc.IntType)
-    if dense_indices:
-        nnz[dense_indices] = n
-    else:
-        nnz[[0, -1]] = 2
-
-    imode = PETSc.InsertMode.INSERT
-    A_petsc = PETSc.Mat().createAIJ(A_numpy.shape, nnz=nnz, comm=PETSc.COMM_SELF)
+    nonzeros = numpy.zeros(A_numpy.shape, dtype=bool)
     if diag:
-        for j, ajj in enumerate(A_numpy.diagonal()):
-            A_petsc.setValue(j, j, ajj, imode)
-
+        numpy.fill_diagonal(nonzeros, True)
     if dense_indices:
-        idx = numpy.arange(n, dtype=PETSc.IntType)
-        for j in dense_indices:
-            A_petsc.setValues(j, idx, A_numpy[j], imode)
-            A_petsc.setValues(idx, j, A_numpy[:][j], imode)
+        nonzeros[dense_indices, :] = True
+        nonzeros[:, dense_indices] = True
     else:
-        A_petsc.setValue(0, n-1, A_numpy[0][-1], imode)
-        A_petsc.setValue(n-1, 0, A_numpy[-1][0], imode)
+        nonzeros[[0, -1], [-1, 0]] = True
 
-    A_petsc.assemble()
-    return A_petsc
+    indptr = numpy.zeros((A_numpy.shape[0]+1,), dtype=PETSc.IntType)
+    numpy.cumsum(numpy.count_nonzero(nonzeros, axis=1), out=indptr[1:])
+    indices = numpy.nonzero(nonzeros)[1].astype(PETSc.IntType)
+    data = A_numpy[nonzeros].astype(PETSc.ScalarType)
+    return PETSc.Mat().createAIJWithArrays(A_numpy.shape, (indptr, indices, data), comm=PETSc.COMM_SELF)
 
 
 @lru_cache(maxsize=10)
@@ -646,26 +727,27 @@ def fdm_setup_ipdg(fdm_element, eta):
     rule = GaussLegendreQuadratureLineRule(ref_el, degree+1)
 
     phi = fdm_element.tabulate(1, rule.get_points())
-    Jhat = phi[(0, )]
-    Dhat = phi[(1, )]
-    Ahat = numpy.dot(numpy.multiply(Dhat, rule.get_weights()), Dhat.T)
-    Bhat = numpy.dot(numpy.multiply(Jhat, rule.get_weights()), Jhat.T)
+    # compute Ahat = Dhat W Dhat^T and Bhat = Jhat W Jhat^T in a single batched product
+    tab = numpy.stack((phi[(1, )], phi[(0, )]))
+    Ahat, Bhat = numpy.matmul(numpy.multiply(tab, rule.get_weights()), numpy.transpose(tab, (0, 2, 1)))
 
     # Facet normal derivatives
     basis = fdm_element.tabulate(1, ref_el.get_vertices())
     Dfacet = basis[(1,)]
     Dfacet[:, 0] = -Dfacet[:, 0]
 
+    # symmetric interior penalty terms from a weak Dirichlet BC on each endpoint
+    n = Ahat.shape[0]
+    E = numpy.eye(n)[[0, -1]]
+    U = numpy.einsum("ij,ik->ijk", Dfacet.T, E)
+    U += numpy.transpose(U, (0, 2, 1)) - eta * numpy.einsum("ij,ik->ijk", E, E)
+
+    # add the penalty terms for every combination of BCs on the endpoints
+    bcs = numpy.array([(bc % 2, bc//2) for bc in range(4)], dtype=Ahat.dtype)
+    Abc = Ahat - numpy.tensordot(bcs, U, axes=1)
+
     Afdm = [numpy_to_petsc(Bhat, [])]
-    for bc in range(4):
-        bcs = (bc % 2, bc//2)
-        Abc = Ahat.copy()
-        for j in (0, -1):
-            if bcs[j] == 1:
-                Abc[:, j] -= Dfacet[:, j]
-                Abc[j, :] -= Dfacet[:, j]
-                Abc[j, j] += eta
-        Afdm.append(numpy_to_petsc(Abc, [0, Abc.shape[0]-1]))
+    Afdm.extend(numpy_to_petsc(A, [0, n-1]) for A in Abc)
     return Afdm, Dfacet
 
 
@@ -677,8 +759,8 @@ def get_interior_facet_maps(V):
     :arg V: a :class:`FunctionSpace`
 
     :returns: the 3-tuple of
-        facet_to_nodes_fun: maps interior facets to the nodes of the two cells sharing it,
-        local_facet_data_fun: maps interior facets to the local facet numbering in the two cells sharing it,
+        facet_to_nodes: a :class:`numpy.ndarray` whose rows are the nodes of the two cells sharing each interior facet,
+        local_facet_data: a :class:`numpy.ndarray` whose rows are the local facet numbering in the two cells sharing each interior facet,
         nfacets: the total number of interior facets owned by this process
     """
     mesh = V.ufl_domain()
@@ -701,70 +783,76 @@ def get_interior_facet_maps(V):
         nelv = cell_node_map.values.shape[0]
         layers = facet_node_map.iterset.layers_array
         itype = cell_offset.dtype
-        shift_h = numpy.array([[0], [1]], itype)
 
         if mesh.variable_layers:
-            nv = 0
-            to_base = []
-            to_layer = []
-            for f, cells in enumerate(facet_to_cells):
-                istart = max(layers[cells, 0])
-                iend = min(layers[cells, 1])
-                nz = iend-istart-1
-                nv += nz
-                to_base.append(numpy.full((nz,), f, itype))
-                to_layer.append(numpy.arange(nz, dtype=itype))
-
+            # number of layers shared by the two cells on each side of the vertical facets
+            istart = numpy.max(layers[facet_to_cells, 0], axis=1)
+            iend = numpy.min(layers[facet_to_cells, 1], axis=1)
+            nz = iend-istart-1
+            nv = sum(nz)
             nh = layers[:, 1]-layers[:, 0]-2
-            to_base.append(numpy.repeat(numpy.arange(len(nh), dtype=itype), nh))
-            to_layer += [numpy.arange(nf, dtype=itype) for nf in nh]
 
-            to_base = numpy.concatenate(to_base)
-            to_layer = numpy.concatenate(to_layer)
+            to_base = numpy.concatenate((numpy.repeat(numpy.arange(len(nz), dtype=itype), nz),
+                                         numpy.repeat(numpy.arange(len(nh), dtype=itype), nh)))
+            to_layer = numpy.concatenate((layer_ranges(nz, itype), layer_ranges(nh, itype)))
             nfacets = nv + sum(nh[:nelv])
 
-            local_facet_data_fun = lambda e: local_facet_data[to_base[e]] if e < nv else local_facet_data_h
-            facet_to_nodes_fun = lambda e: facet_to_nodes[to_base[e]] + to_layer[e]*facet_offset if e < nv else numpy.reshape(cell_to_nodes[to_base[e]] + numpy.kron(to_layer[e]+shift_h, cell_offset), (-1,))
+            # vertical facets
+            vnodes = facet_to_nodes[to_base[:nv]] + numpy.multiply.outer(to_layer[:nv], facet_offset)
+            vdata = local_facet_data[to_base[:nv]]
+            # horizontal facets between the cells on top of each other
+            hnodes = cell_to_nodes[to_base[nv:nfacets]] + numpy.multiply.outer(to_layer[nv:nfacets], cell_offset)
         else:
             nelz = layers[0, 1]-layers[0, 0]-1
             nv = nbase * nelz
             nh = nelv * (nelz-1)
             nfacets = nv + nh
 
-            local_facet_data_fun = lambda e: local_facet_data[e//nelz] if e < nv else local_facet_data_h
-            facet_to_nodes_fun = lambda e: facet_to_nodes[e//nelz] + (e % nelz)*facet_offset if e < nv else numpy.reshape(cell_to_nodes[(e-nv)//(nelz-1)] + numpy.kron(((e-nv) % (nelz-1))+shift_h, cell_offset), (-1,))
+            # vertical facets
+            vnodes = facet_to_nodes[:, None, :] + numpy.multiply.outer(numpy.arange(nelz, dtype=itype), facet_offset)
+            vnodes = numpy.reshape(vnodes, (nv, facet_to_nodes.shape[1]))
+            vdata = numpy.repeat(local_facet_data, nelz, axis=0)
+            # horizontal facets between the cells on top of each other
+            hnodes = cell_to_nodes[:nelv, None, :] + numpy.multiply.outer(numpy.arange(nelz-1, dtype=itype), cell_offset)
+            hnodes = numpy.reshape(hnodes, (nh, cell_to_nodes.shape[1]))
+
+        hnodes = numpy.concatenate((hnodes, hnodes + cell_offset), axis=1)
+        hdata = numpy.tile(local_facet_data_h, (hnodes.shape[0], 1))
+        facet_to_nodes = numpy.concatenate((vnodes, hnodes))
+        local_facet_data = numpy.concatenate((vdata, hdata))
     else:
-        facet_to_nodes_fun = lambda e: facet_to_nodes[e]
-        local_facet_data_fun = lambda e: local_facet_data[e]
         nfacets = nbase
 
-    return facet_to_nodes_fun, local_facet_data_fun, nfacets
+    return facet_to_nodes, local_facet_data, nfacets
 
 
-@lru_cache(maxsize=10)
-def glonum_fun(node_map):
+def get_cell_count(node_map):
     """
-    Return a function that maps each topological entity to its nodes and the total number of entities.
+    Return the number of topological entities owned by this process, counting every layer on extruded meshes.
 
     :arg node_map: a :class:`pyop2.Map` mapping entities to their nodes, including ghost entities.
-
-    :returns: a 2-tuple with the map and the number of cells owned by this process
     """
     nelv = node_map.values.shape[0]
     if node_map.offset is None:
-        return lambda e: node_map.values_with_halo[e], nelv
+        return nelv
+    layers = node_map.iterset.layers_array
+    nelz = layers[:, 1]-layers[:, 0]-1
+    if layers.shape[0] == 1:
+        return nelz[0]*nelv
     else:
-        layers = node_map.iterset.layers_array
-        if layers.shape[0] == 1:
-            nelz = layers[0, 1]-layers[0, 0]-1
-            nel = nelz*nelv
-            return lambda e: node_map.values_with_halo[e//nelz] + (e % nelz)*node_map.offset, nel
-        else:
-            nelz = layers[:, 1]-layers[:, 0]-1
-            nel = sum(nelz[:nelv])
-            to_base = numpy.repeat(numpy.arange(node_map.values_with_halo.shape[0], dtype=node_map.offset.dtype), nelz)
-            to_layer = numpy.concatenate([numpy.arange(nz, dtype=node_map.offset.dtype) for nz in nelz])
-            return lambda e: node_map.values_with_halo[to_base[e]] + to_layer[e]*node_map.offset, nel
+        return sum(nelz[:nelv])
+
+
+def layer_ranges(nelz, dtype):
+    """
+    Return the concatenation of numpy.arange(n) for each n in nelz.
+
+    :arg nelz: a :class:`numpy.ndarray` with the number of layers on each column
+    :arg dtype: the integer type of the result
+    """
+    nelz = numpy.asarray(nelz, dtype=dtype)
+    starts = numpy.cumsum(nelz, dtype=dtype) - nelz
+    return numpy.arange(sum(nelz), dtype=dtype) - numpy.repeat(starts, nelz)
 
 
 def glonum(node_map):
@@ -778,14 +866,17 @@ def glonum(node_map):
     if (node_map.offset is None) or (node_map.values_with_halo.size == 0):
         return node_map.values_with_halo
     else:
+        values = node_map.values_with_halo
+        offset = node_map.offset
         layers = node_map.iterset.layers_array
         if layers.shape[0] == 1:
             nelz = layers[0, 1]-layers[0, 0]-1
-            to_layer = numpy.tile(numpy.arange(nelz, dtype=node_map.offset.dtype), len(node_map.values_with_halo))
+            gl = values[:, None, :] + numpy.multiply.outer(numpy.arange(nelz, dtype=offset.dtype), offset)
+            return numpy.reshape(gl, (-1, values.shape[1]))
         else:
             nelz = layers[:, 1]-layers[:, 0]-1
-            to_layer = numpy.concatenate([numpy.arange(nz, dtype=node_map.offset.dtype) for nz in nelz])
-        return numpy.repeat(node_map.values_with_halo, nelz, axis=0) + numpy.kron(to_layer.reshape((-1, 1)), node_map.offset)
+            to_layer = layer_ranges(nelz, offset.dtype)
+            return numpy.repeat(values, nelz, axis=0) + numpy.multiply.outer(to_layer, offset)
 
 
 def get_weak_bc_flags(J):
@@ -608,7 +608,7 @@ kronmxv_code = """
 static inline void kronmxv(PetscBLASInt tflag,
     PetscBLASInt mx, PetscBLASInt my, PetscBLASInt mz,
     PetscBLASInt nx, PetscBLASInt ny, PetscBLASInt nz, PetscBLASInt nel,
-    PetscScalar *A1, PetscScalar *A2, PetscScalar *A3,
+    const PetscScalar *A1, const PetscScalar *A2, const PetscScalar *A3,
     PetscScalar **x, PetscScalar **y){
 
 /*
@@ -699,7 +699,7 @@ def make_kron_code(Vf, Vc, t_in, t_out, mat_name):
     fargs = ", ".join(map(str, fshape+[1]*(3-len(fshape))))
     cargs = ", ".join(map(str, cshape+[1]*(3-len(cshape))))
     operator_decl = f"""
-            PetscScalar {mat_name}[{Jsize[-1]}] = {{ {Jdata} }};
+        static const PetscScalar {mat_name}[{Jsize[-1]}] = {{ {Jdata} }};
     """
     prolong_code = f"""
             kronmxv(0, {fargs}, {cargs}, {nscal}, {Jargs}, &{t_in}, &{t_out});
@@ -821,7 +821,7 @@ def make_permutation_code(V, vshape, pshape, t_in, t_out, array_name):
         pdata = ", ".join(map(str, permutation.flat))
 
         decl = f"""
-            PetscInt {array_name}[{ndof}] = {{ {pdata} }};
+        static const PetscInt {array_name}[{ndof}] = {{ {pdata} }};
         """
         prolong = f"""
             for({IntType_c} i=0; i<{ndof}; i++) {t_out}[{array_name}[i]] = {t_in}[i];
@@ -866,6 +866,23 @@ def get_permuted_map(V):
     return PermutedMap(V.cell_node_map(), permutation)
 
 
+def get_bc_dofs(V, bcs):
+    """
+    Return the indices of the owned DOFs of V that are constrained by a list of DirichletBCs,
+    in the local numbering of a :class:`PETSc.Vec` on V.
+    """
+    bs = V.value_size
+    dofs = [numpy.empty((0,), dtype=PETSc.IntType)]
+    for bc in bcs:
+        nodes = bc.nodes[bc.nodes < V.dof_dset.size].astype(PETSc.IntType)
+        component = bc.function_space().component
+        if component is None:
+            dofs.append(numpy.reshape(numpy.add.outer(nodes*bs, numpy.arange(bs, dtype=PETSc.IntType)), (-1,)))
+        else:
+            dofs.append(nodes*bs + component)
+    return numpy.unique(numpy.concatenate(dofs))
+
+
 class StandaloneInterpolationMatrix(object):
     """
     Interpolation matrix for a single standalone space.
@@ -883,6 +900,8 @@ class StandaloneInterpolationMatrix(object):
             Vc = Vc.function_space()
         else:
             self.uc = firedrake.Function(Vc)
+        self.Vf_bcdofs = get_bc_dofs(Vf, Vf_bcs)
+        self.Vc_bcdofs = get_bc_dofs(Vc, Vc_bcs)
 
         self.weight = self.multiplicity(Vf)
         with self.weight.dat.vec as w:
@@ -1011,12 +1030,13 @@ class StandaloneInterpolationMatrix(object):
 
         {kronmxv_code}
 
+        {operator_decl}
+
         void prolongation(PetscScalar *restrict y, const PetscScalar *restrict x,
                           const PetscScalar *restrict w{coef_decl}){{
             PetscScalar work[2][{lwork}];
             PetscScalar *t0 = work[0];
             PetscScalar *t1 = work[1];
-            {operator_decl}
             {coarse_read}
             {prolong_code}
             {fine_write}
@@ -1028,7 +1048,6 @@ class StandaloneInterpolationMatrix(object):
             PetscScalar work[2][{lwork}];
             PetscScalar *t0 = work[0];
             PetscScalar *t1 = work[1];
-            {operator_decl}
             {fine_read}
             {restrict_code}
             {coarse_write}
@@ -1096,17 +1115,15 @@ class StandaloneInterpolationMatrix(object):
         """
         with self.uf.dat.vec_wo as uf:
             rf.copy(uf)
-        for bc in self.Vf_bcs:
-            bc.zero(self.uf)
+            uf.array_w[self.Vf_bcdofs] = 0.0E0
 
         with self.uc.dat.vec_wo as uc:
             uc.set(0.0E0)
         self._restrict()
 
-        for bc in self.Vc_bcs:
-            bc.zero(self.uc)
         with self.uc.dat.vec_ro as uc:
             uc.copy(rc)
+        rc.array_w[self.Vc_bcdofs] = 0.0E0
 
     def mult(self, mat, xc, xf, inc=False):
         """
@@ -1114,20 +1131,17 @@ class StandaloneInterpolationMatrix(object):
         """
         with self.uc.dat.vec_wo as uc:
             xc.copy(uc)
-        for bc in self.Vc_bcs:
-            bc.zero(self.uc)
+            uc.array_w[self.Vc_bcdofs] = 0.0E0
 
         with self.uf.dat.vec_wo as uf:
             uf.set(0.0E0)
         self._prolong()
 
-        for bc in self.Vf_bcs:
-            bc.zero(self.uf)
-        if inc:
-            with self.uf.dat.vec_ro as uf:
+        with self.uf.dat.vec as uf:
+            uf.array_w[self.Vf_bcdofs] = 0.0E0
+            if inc:
                 xf.axpy(1.0, uf)
-        else:
-            with self.uf.dat.vec_ro as uf:
+            else:
                 uf.copy(xf)
 
     def multAdd(self, mat, x, y, w):
@@ -1155,6 +1169,12 @@ class MixedInterpolationMatrix(StandaloneInterpolationMatrix):
             standalone = StandaloneInterpolationMatrix(uf_sub, uc_sub, Vf_sub_bcs, Vc_sub_bcs)
             self.standalones.append(standalone)
 
+        # concatenate the BC DOFs of each subspace in the numbering of the mixed Vec
+        foffsets = numpy.cumsum([0] + [s.uf.dof_dset.size * s.uf.dof_dset.cdim for s in self.standalones])
+        coffsets = numpy.cumsum([0] + [s.uc.dof_dset.size * s.uc.dof_dset.cdim for s in self.standalones])
+        self.Vf_bcdofs = numpy.concatenate([s.Vf_bcdofs + offset for s, offset in zip(self.standalones, foffsets)])
+        self.Vc_bcdofs = numpy.concatenate([s.Vc_bcdofs + offset for s, offset in zip(self.standalones, coffsets)])
+
         self._prolong = lambda: [standalone._prolong() for standalone in self.standalones]
         self._restrict = lambda: [standalone._restrict() for standalone in self.standalones]
 